@@ -0,0 +1,145 @@
+"""Threaded webcam capture so reading frames overlaps with processing."""
+
+import queue
+import sys
+import threading
+
+
+def open_capture(device, width, height, fps, yuyv=False):
+    """
+    Open the webcam. With `yuyv`, frames come raw from V4L2 (2 bytes per
+    pixel) instead of being converted to BGR.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(device)
+    if yuyv:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"YUYV"))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    cap.set(cv2.CAP_PROP_FPS, fps)
+
+    # Raw frames are reshaped to the requested size, so the camera must
+    # deliver exactly that
+    if yuyv and cap.isOpened():
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        if (
+            int(cap.get(cv2.CAP_PROP_FOURCC)) != cv2.VideoWriter_fourcc(*"YUYV")
+            or int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) != width
+            or int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) != height
+        ):
+            print(
+                f"Error: webcam does not support YUYV at {width}x{height}",
+                file=sys.stderr,
+                flush=True,
+            )
+            cap.release()
+
+    return cap
+
+
+class FrameGrabber:
+    """
+    Reads webcam frames on a worker thread into a small queue.
+
+    Pass an open `cap` (the caller releases it), or an `opener` returning
+    one: the webcam is then opened on the worker thread, so a slow V4L2 open
+    doesn't stall the caller, and released when the grabber stops.
+    """
+
+    def __init__(self, cap=None, maxsize=2, frame_shape=None, opener=None):
+        self.cap = cap
+        self.opener = opener
+        self.frame_shape = frame_shape  # Reshape raw (e.g. YUYV) frames to this
+        self.frames = queue.Queue(maxsize=maxsize)
+        self.stop_event = threading.Event()
+        self.ready = threading.Event()  # Set once the first frame is queued
+        self.open_failed = False
+        self.failed = False  # Set once capture stopped on a failed read
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        """Start capturing in the background."""
+        self._thread.start()
+        return self
+
+    def _run(self):
+        if self.cap is None:
+            try:
+                self.cap = self.opener()
+                if not self.cap.isOpened():
+                    self.open_failed = True
+                    self._put(None)
+                    return
+                self._capture()
+            except Exception as e:
+                print(f"Error: could not open webcam: {e}", file=sys.stderr, flush=True)
+                self.open_failed = True
+                self._put(None)
+            finally:
+                if self.cap is not None:
+                    self.cap.release()
+                self.ready.set()
+        else:
+            self._capture()
+
+    def _capture(self):
+        # cap.read() releases the GIL while waiting for the camera, so the main
+        # loop can run inference and blur on the previous frame meanwhile
+        try:
+            while not self.stop_event.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    self._fail()
+                    return
+                if self.frame_shape is not None:
+                    frame = frame.reshape(self.frame_shape)
+                self._put(frame)
+                self.ready.set()
+        except Exception as e:
+            print(f"Error: webcam capture failed: {e}", file=sys.stderr, flush=True)
+            self._fail()
+
+    def _fail(self):
+        """Mark capture as failed and wake up the reader."""
+        self.failed = True
+        self._put(None)
+
+    def _put(self, frame):
+        """Queue a frame, dropping the oldest one if processing falls behind."""
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def read(self, timeout=None):
+        """
+        Get the next frame, like cv2.VideoCapture.read(). Blocks until one
+        arrives, or for at most `timeout` seconds; a timeout also returns
+        (False, None), check `failed` to tell it apart. Once capture failed,
+        returns right away.
+        """
+        try:
+            frame = self.frames.get(block=not self.failed, timeout=timeout)
+        except queue.Empty:
+            return False, None
+        return frame is not None, frame
+
+    def is_alive(self):
+        """Check whether the worker thread (and so possibly the webcam) is still busy."""
+        return self._thread.is_alive()
+
+    def stop(self, wait=True):
+        """
+        Stop capturing (and release the webcam if we opened it).
+        With wait=False, returns right away; check is_alive() before
+        opening the webcam again.
+        """
+        self.stop_event.set()
+        if wait and self._thread.is_alive():
+            self._thread.join(timeout=1.0)
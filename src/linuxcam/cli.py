@@ -137,6 +137,8 @@ def cmd_config(args):
     print()
     print("Advanced:")
     print(f"  threshold: {config['threshold']} (detection sensitivity, 0-1)")
+    print(f"  infer_every: {config['infer_every']} (run the model every N frames)")
+    print(f"  smoothing: {config['smoothing']} (mask smoothing between frames, 0-0.95)")
     return 0
 
 
@@ -146,8 +148,15 @@ def cmd_run(args):
     import cv2
     import numpy as np
     import pyvirtualcam
+    from .capture import FrameGrabber, open_capture
     from .models import get_model_path
-    from .segmentation import SelfieSegmentation, apply_background_blur
+    from .segmentation import (
+        MAX_SMOOTHING,
+        SelfieSegmentation,
+        apply_background_blur,
+        apply_background_blur_yuyv,
+        yuyv_thumbnail,
+    )
     from .config import get_config_path
 
     # Load config
@@ -166,19 +175,21 @@ def cmd_run(args):
     # Ensure blur is odd
     blur_strength = config["blur"] if config["blur"] % 2 == 1 else config["blur"] + 1
     threshold = config["threshold"]
+    infer_every = max(1, config["infer_every"])
+    smoothing = min(max(config["smoothing"], 0.0), MAX_SMOOTHING)
 
     # Get/download model
     print("Loading model...")
-    model_path = get_model_path()
+    model_path = get_model_path(precision=config["precision"])
     segmentation = SelfieSegmentation(model_path)
     print(f"Model loaded: {model_path}")
 
     # Open webcam
     print(f"Opening webcam {config['input']}...")
-    cap = cv2.VideoCapture(config["input"])
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, config["width"])
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config["height"])
-    cap.set(cv2.CAP_PROP_FPS, config["fps"])
+    yuyv = config["yuyv"]
+    cap = open_capture(
+        config["input"], config["width"], config["height"], config["fps"], yuyv=yuyv
+    )
 
     if not cap.isOpened():
         print(f"Error: Could not open webcam {config['input']}", file=sys.stderr)
@@ -201,13 +212,21 @@ def cmd_run(args):
 
     print(f"Opening virtual camera {config['output']}...")
 
+    # Output frame, reused every frame
+    frame_shape = (actual_height, actual_width, 2 if yuyv else 3)
+    out = np.empty(frame_shape, dtype=np.uint8)
+
+    # Capture on a worker thread so reading the next frame overlaps processing
+    grabber = FrameGrabber(cap, frame_shape=frame_shape if yuyv else None).start()
+
     try:
         with pyvirtualcam.Camera(
             width=actual_width,
             height=actual_height,
             fps=config["fps"],
             device=config["output"],
-            fmt=pyvirtualcam.PixelFormat.RGB,
+            # Send frames as captured, no conversion
+            fmt=pyvirtualcam.PixelFormat.YUYV if yuyv else pyvirtualcam.PixelFormat.BGR,
         ) as vcam:
             print(f"Virtual camera started: {vcam.device}")
             print(f"Blur: {blur_strength}")
@@ -220,9 +239,11 @@ def cmd_run(args):
             start_time = time.time()
             last_config_check = time.time()
             config_mtime = get_config_mtime()
+            mask = None
+            frame_idx = 0
 
             while True:
-                ret, frame = cap.read()
+                ret, frame = grabber.read()
                 if not ret:
                     print("Error reading frame", file=sys.stderr)
                     break
@@ -239,19 +260,26 @@ def cmd_run(args):
                             blur_strength = new_blur
                             threshold = new_config["threshold"]
                             print(f"\rSettings updated: blur={blur_strength}  ", flush=True)
+                        infer_every = max(1, new_config["infer_every"])
+                        smoothing = min(max(new_config["smoothing"], 0.0), MAX_SMOOTHING)
                     last_config_check = now
 
-                # Get segmentation mask
-                mask = segmentation.get_mask(frame, threshold=threshold)
+                # Get segmentation mask (every infer_every frames, reused in between)
+                if mask is None or frame_idx % infer_every == 0:
+                    mask = segmentation.get_mask(
+                        yuyv_thumbnail(frame) if yuyv else frame,
+                        threshold=threshold,
+                        smoothing=smoothing,
+                        size=(actual_width, actual_height),
+                    )
+                frame_idx += 1
 
                 # Apply background blur
-                result = apply_background_blur(frame, mask, blur_strength)
-
-                # Convert BGR to RGB for virtual camera
-                result_rgb = cv2.cvtColor(result, cv2.COLOR_BGR2RGB)
+                blur = apply_background_blur_yuyv if yuyv else apply_background_blur
+                result = blur(frame, mask, blur_strength, out=out)
 
-                # Send to virtual camera
-                vcam.send(result_rgb)
+                # Send to virtual camera (as captured, BGR or YUYV)
+                vcam.send(result)
                 vcam.sleep_until_next_frame()
 
                 # Print FPS every second
@@ -269,6 +297,7 @@ def cmd_run(args):
         print(f"\nError: {e}", file=sys.stderr)
         return 1
     finally:
+        grabber.stop()
         cap.release()
 
     return 0
@@ -344,7 +373,7 @@ The daemon watches BlurCam - blur starts automatically when an app uses it.
     # Download model only
     if getattr(args, 'download_model', False):
         from .models import get_model_path
-        get_model_path(force_download=True)
+        get_model_path(force_download=True, precision=load_config()["precision"])
         print("Model downloaded successfully!")
         return 0
 
@@ -16,6 +16,10 @@ DEFAULT_CONFIG = {
     "width": 640,
     "height": 480,
     "fps": 30,
+    "precision": "fp32",
+    "infer_every": 2,
+    "smoothing": 0.7,
+    "yuyv": False,
 }
 
 
@@ -12,6 +12,10 @@ import time
 import numpy as np
 from inotify_simple import INotify, flags
 
+# How long to wait for a consumer's fd to show up in /proc after an event
+CONSUMER_POLL_INTERVAL = 0.01
+CONSUMER_POLL_TIMEOUT = 0.1
+
 
 class BlurDaemon:
     """Always writes to virtual cam. Blur activates when consumers connect."""
@@ -22,7 +26,13 @@ class BlurDaemon:
         self.blur_active = False
         self.stop_event = threading.Event()
         self.consumer_event = threading.Event()  # Set when consumer state changes
+        self.config_event = threading.Event()  # Set when the config file is written
         self.has_consumers = False
+        self._consumer_pids = set()  # Processes last seen with the device open
+
+        # Segmentation runs every `infer_every` frames, reusing the mask in between
+        self._mask_cache = None
+        self._frame_idx = 0
 
         # Load config
         from .config import load_config
@@ -31,38 +41,79 @@ class BlurDaemon:
         self.width = self.config["width"]
         self.height = self.config["height"]
         self.fps = self.config["fps"]
+        self.yuyv = self.config["yuyv"]  # Raw YUYV end-to-end, blurring luma only
+        self.frame_shape = (self.height, self.width, 2 if self.yuyv else 3)
 
-    def _get_consumer_count(self):
-        """Count processes that have the device open (excluding ourselves)."""
-        my_pid = os.getpid()
-        count = 0
+        # Output frame, reused every frame so the blend and the write to the
+        # virtual camera always touch the same (cache-hot) memory
+        self._out = np.empty(self.frame_shape, dtype=np.uint8)
+
+    def _holds_device(self, pid):
+        """Check whether a process has the virtual camera open."""
+        try:
+            with os.scandir(f'/proc/{pid}/fd') as fds:
+                for fd in fds:
+                    try:
+                        if os.readlink(fd.path) == self.device:
+                            return True
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return False
+
+    def _known_consumer(self):
+        """Find a process seen holding the device before that still does."""
+        for pid in list(self._consumer_pids):
+            if self._holds_device(pid):
+                return pid
+            self._consumer_pids.discard(pid)
+        return None
+
+    def _find_consumer(self):
+        """Find a process that has the device open (excluding ourselves)."""
+        # Processes seen holding the device before are the likely candidates,
+        # so check them before scanning every process
+        pid = self._known_consumer()
+        if pid is not None:
+            return pid
 
+        my_pid = os.getpid()
         try:
-            for pid_dir in os.listdir('/proc'):
-                if not pid_dir.isdigit():
-                    continue
-                pid = int(pid_dir)
-                if pid == my_pid:
-                    continue
-                try:
-                    fd_dir = f'/proc/{pid}/fd'
-                    for fd in os.listdir(fd_dir):
-                        try:
-                            target = os.readlink(f'{fd_dir}/{fd}')
-                            if target == self.device:
-                                count += 1
-                                break
-                        except (OSError, PermissionError):
-                            pass
-                except (OSError, PermissionError):
-                    pass
-        except Exception:
+            with os.scandir('/proc') as procs:
+                for proc in procs:
+                    if not proc.name.isdigit():
+                        continue
+                    pid = int(proc.name)
+                    if pid != my_pid and self._holds_device(pid):
+                        self._consumer_pids.add(pid)
+                        return pid
+        except OSError:
             pass
 
-        return count
+        return None
+
+    def _check_consumers(self, expected):
+        """
+        Check whether consumers are connected. The fd may not be (un)registered
+        yet when inotify fires, so poll the known consumers briefly until the
+        state matches what the event suggests, then scan /proc once.
+        """
+        deadline = time.monotonic() + CONSUMER_POLL_TIMEOUT
+        while True:
+            known = self._known_consumer() is not None
+            if known and expected:
+                return True
+            if known == expected or time.monotonic() >= deadline:
+                break
+            time.sleep(CONSUMER_POLL_INTERVAL)
+
+        return self._find_consumer() is not None
 
     def _inotify_watcher(self):
         """Watch for open/close events on the virtual camera device."""
+        from .config import get_config_path
+
         inotify = INotify()
         watch_flags = flags.OPEN | flags.CLOSE_NOWRITE | flags.CLOSE_WRITE
 
@@ -72,24 +123,31 @@ class BlurDaemon:
             print(f"Warning: Could not watch {self.device}: {e}", file=sys.stderr, flush=True)
             return
 
+        # Also watch the config directory so setting changes apply right away
+        config_path = get_config_path()
+        try:
+            config_wd = inotify.add_watch(config_path.parent, flags.CLOSE_WRITE | flags.MOVED_TO)
+        except OSError:
+            config_wd = None
+
         while not self.stop_event.is_set():
             # Read with timeout so we can check stop_event
             events = inotify.read(timeout=500)
 
             for event in events:
-                if event.mask & flags.OPEN:
+                if event.wd == config_wd:
+                    if event.name == config_path.name:
+                        self.config_event.set()
+
+                elif event.mask & flags.OPEN:
                     # Someone opened the device - check if it's a real consumer
-                    time.sleep(0.05)  # Brief delay for fd to be registered
-                    consumers = self._get_consumer_count()
-                    if consumers > 0:
+                    if self._check_consumers(True):
                         self.has_consumers = True
                         self.consumer_event.set()
 
                 elif event.mask & (flags.CLOSE_NOWRITE | flags.CLOSE_WRITE):
                     # Someone closed the device - check if consumers remain
-                    time.sleep(0.05)  # Brief delay for fd to be unregistered
-                    consumers = self._get_consumer_count()
-                    if consumers == 0:
+                    if not self._check_consumers(False):
                         self.has_consumers = False
                         self.consumer_event.set()
 
@@ -97,10 +155,16 @@ class BlurDaemon:
 
     def run(self):
         """Main daemon loop - always writes frames."""
-        import cv2
         import pyvirtualcam
+        from .capture import FrameGrabber, open_capture
         from .models import get_model_path
-        from .segmentation import SelfieSegmentation, apply_background_blur
+        from .segmentation import (
+            MAX_SMOOTHING,
+            SelfieSegmentation,
+            apply_background_blur,
+            apply_background_blur_yuyv,
+            yuyv_thumbnail,
+        )
         from .config import load_config, get_config_mtime
 
         print(f"blurcam daemon started", flush=True)
@@ -114,6 +178,14 @@ class BlurDaemon:
             print("Run 'blurcam-setup' to configure v4l2loopback.", file=sys.stderr, flush=True)
             return 1
 
+        # Download/convert the model up front, so the first consumer isn't
+        # kept waiting on it
+        try:
+            model_path = get_model_path(precision=self.config["precision"])
+        except Exception as e:
+            print(f"Error: Could not load model: {e}", file=sys.stderr, flush=True)
+            return 1
+
         # Handle signals
         def signal_handler(sig, frame):
             print("\nShutting down...", flush=True)
@@ -126,19 +198,24 @@ class BlurDaemon:
         watcher_thread = threading.Thread(target=self._inotify_watcher, daemon=True)
         watcher_thread.start()
 
-        # Lazy-load model and webcam (only when needed)
+        # Lazy-load model session and webcam (only when needed)
         segmentation = None
-        cap = None
-        model_path = None
+        grabber = None
+        stopping_grabber = None  # Previous grabber, until it released the webcam
 
         # Create black frame for idle mode
-        black_frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        black_frame = np.zeros(self.frame_shape, dtype=np.uint8)
+        if self.yuyv:
+            black_frame[:, :, 1] = 128  # Neutral chroma
 
         config_mtime = get_config_mtime()
+        last_config_check = time.monotonic()
         blur_strength = self.config["blur"]
         if blur_strength % 2 == 0:
             blur_strength += 1
         threshold = self.config["threshold"]
+        infer_every = max(1, self.config["infer_every"])
+        smoothing = min(max(self.config["smoothing"], 0.0), MAX_SMOOTHING)
 
         try:
             with pyvirtualcam.Camera(
@@ -146,7 +223,8 @@ class BlurDaemon:
                 height=self.height,
                 fps=self.fps,
                 device=self.device,
-                fmt=pyvirtualcam.PixelFormat.RGB,
+                # Send frames as captured, no conversion
+                fmt=pyvirtualcam.PixelFormat.YUYV if self.yuyv else pyvirtualcam.PixelFormat.BGR,
             ) as vcam:
                 print(f"Virtual camera ready: {vcam.device}", flush=True)
                 print(f"Select 'BlurCam' in your video app", flush=True)
@@ -164,53 +242,86 @@ class BlurDaemon:
 
                             # Load model if needed
                             if segmentation is None:
-                                model_path = get_model_path()
                                 segmentation = SelfieSegmentation(model_path)
-
-                            # Open webcam
-                            if cap is None or not cap.isOpened():
-                                cap = cv2.VideoCapture(self.input_device)
-                                cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-                                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-                                cap.set(cv2.CAP_PROP_FPS, self.fps)
-
-                                if not cap.isOpened():
-                                    print(f"Error: Could not open webcam", file=sys.stderr, flush=True)
-                                    self.blur_active = False
+                            segmentation.reset()
+                            self._mask_cache = None
+                            self._frame_idx = 0
 
                         elif not self.has_consumers and self.blur_active:
                             # No consumers - stop blur IMMEDIATELY
                             print(f"No consumers - releasing webcam", flush=True)
                             self.blur_active = False
 
-                            # Release webcam immediately
-                            if cap is not None:
-                                cap.release()
-                                cap = None
-
-                    # Check for config changes
-                    new_mtime = get_config_mtime()
-                    if new_mtime > config_mtime:
-                        config_mtime = new_mtime
-                        self.config = load_config()
-                        blur_strength = self.config["blur"]
-                        if blur_strength % 2 == 0:
-                            blur_strength += 1
-                        threshold = self.config["threshold"]
+                            # Release webcam immediately, without waiting for a
+                            # slow open to finish
+                            if grabber is not None:
+                                grabber.stop(wait=False)
+                                stopping_grabber = grabber
+                                grabber = None
+
+                    # Open webcam in the background, sending black frames until
+                    # it delivers, so the consumer isn't stalled. If a previous
+                    # grabber still holds the webcam, wait for it to let go.
+                    if stopping_grabber is not None and not stopping_grabber.is_alive():
+                        stopping_grabber = None
+                    if self.blur_active and grabber is None and stopping_grabber is None:
+                        grabber = FrameGrabber(
+                            opener=lambda: open_capture(
+                                self.input_device, self.width, self.height, self.fps,
+                                yuyv=self.yuyv,
+                            ),
+                            frame_shape=self.frame_shape if self.yuyv else None,
+                        ).start()
+
+                    # Check for config changes when the watcher reports a write,
+                    # or once per second in case inotify is unavailable
+                    now = time.monotonic()
+                    if self.config_event.is_set() or now - last_config_check >= 1.0:
+                        self.config_event.clear()
+                        last_config_check = now
+                        new_mtime = get_config_mtime()
+                        if new_mtime > config_mtime:
+                            config_mtime = new_mtime
+                            self.config = load_config()
+                            blur_strength = self.config["blur"]
+                            if blur_strength % 2 == 0:
+                                blur_strength += 1
+                            threshold = self.config["threshold"]
+                            infer_every = max(1, self.config["infer_every"])
+                            smoothing = min(max(self.config["smoothing"], 0.0), MAX_SMOOTHING)
 
                     # Generate frame
-                    if self.blur_active and cap is not None and cap.isOpened():
-                        ret, frame = cap.read()
+                    if self.blur_active and grabber is not None and grabber.open_failed:
+                        print(f"Error: Could not open webcam", file=sys.stderr, flush=True)
+                        self.blur_active = False
+                        grabber.stop()
+                        grabber = None
+                        vcam.send(black_frame)
+                    elif self.blur_active and grabber is not None and grabber.failed:
+                        print("Error: Could not read from webcam", file=sys.stderr, flush=True)
+                        self.blur_active = False
+                        grabber.stop()
+                        grabber = None
+                        vcam.send(black_frame)
+                    elif self.blur_active and grabber is not None and grabber.ready.is_set():
+                        ret, frame = grabber.read(timeout=1.0)
                         if ret:
                             # Apply blur
-                            mask = segmentation.get_mask(frame, threshold=threshold)
-                            result = apply_background_blur(frame, mask, blur_strength)
-                            result_rgb = cv2.cvtColor(result, cv2.COLOR_BGR2RGB)
-                            vcam.send(result_rgb)
+                            if self._mask_cache is None or self._frame_idx % infer_every == 0:
+                                self._mask_cache = segmentation.get_mask(
+                                    yuyv_thumbnail(frame) if self.yuyv else frame,
+                                    threshold=threshold,
+                                    smoothing=smoothing,
+                                    size=(frame.shape[1], frame.shape[0]),
+                                )
+                            self._frame_idx += 1
+                            blur = apply_background_blur_yuyv if self.yuyv else apply_background_blur
+                            result = blur(frame, self._mask_cache, blur_strength, out=self._out)
+                            vcam.send(result)
                         else:
                             vcam.send(black_frame)
                     else:
-                        # Send black frame when idle
+                        # Send black frame when idle or while the webcam starts
                         vcam.send(black_frame)
 
                     vcam.sleep_until_next_frame()
@@ -219,8 +330,10 @@ class BlurDaemon:
             print(f"Error: {e}", file=sys.stderr, flush=True)
             return 1
         finally:
-            if cap is not None:
-                cap.release()
+            if grabber is not None:
+                grabber.stop()
+            if stopping_grabber is not None:
+                stopping_grabber.stop()
 
         return 0
 
@@ -1,8 +1,13 @@
 """Model download and management."""
 
 import os
+import sys
 from pathlib import Path
 
+# Model precisions: "fp32" is the original download, "fp16" is converted with
+# onnxconverter-common.
+PRECISIONS = ("fp16", "fp32")
+
 
 def get_cache_dir() -> Path:
     """Get the cache directory for model files (XDG compliant)."""
@@ -15,10 +20,69 @@ def get_cache_dir() -> Path:
     return cache_dir
 
 
-def get_model_path(force_download: bool = False) -> str:
+def _convert_fp16(src: str, dst: Path) -> None:
+    """Convert the model to FP16, keeping float32 inputs/outputs."""
+    import onnx
+    from onnxconverter_common import float16
+
+    model = onnx.load(src)
+    model = float16.convert_float_to_float16(model, keep_io_types=True)
+    onnx.save(model, str(dst))
+
+
+def get_precision_model_path(
+    model_path: str, precision: str, force: bool = False
+) -> str:
+    """
+    Convert the FP32 model to the requested precision, caching the result.
+    Falls back to the FP32 model if the conversion fails. The failure is
+    remembered, so it is only retried with `force` (--download-model).
+    """
+    if precision == "fp32":
+        return model_path
+    if precision not in PRECISIONS:
+        print(
+            f"Warning: unknown model precision {precision!r}, using fp32",
+            file=sys.stderr,
+        )
+        return model_path
+
+    converted = get_cache_dir() / f"model_{precision}.onnx"
+    failed = converted.with_suffix(".failed")
+    if not force:
+        if converted.exists():
+            return str(converted)
+        if failed.exists():
+            return model_path
+
+    print(f"Converting model to {precision} (only happens once)...")
+    # Convert to a temporary file and move it into place, so an interrupted
+    # conversion never leaves a truncated model behind
+    tmp = converted.with_name(f".{converted.name}.{os.getpid()}.tmp")
+    try:
+        _convert_fp16(model_path, tmp)
+        os.replace(tmp, converted)
+    except Exception as e:
+        tmp.unlink(missing_ok=True)
+        reason = e
+        if isinstance(e, ImportError):
+            reason = f"install the {precision} extra: {e}"
+        print(
+            f"Warning: {precision} conversion failed ({reason}), using fp32",
+            file=sys.stderr,
+        )
+        print("Run 'blurcam --download-model' to try again.", file=sys.stderr)
+        failed.write_text(f"{reason}\n")
+        return model_path
+
+    failed.unlink(missing_ok=True)
+    return str(converted)
+
+
+def get_model_path(force_download: bool = False, precision: str = "fp32") -> str:
     """
     Download model from HuggingFace Hub if not cached.
-    Returns the local path to the model file.
+    Returns the local path to the model file, converted to `precision`.
     """
     from huggingface_hub import hf_hub_download
 
@@ -26,7 +90,7 @@ def get_model_path(force_download: bool = False) -> str:
     model_file = cache_dir / "model.onnx"
 
     if model_file.exists() and not force_download:
-        return str(model_file)
+        return get_precision_model_path(str(model_file), precision)
 
     print("Downloading selfie segmentation model from HuggingFace Hub...")
     print(f"This only happens once. Model will be cached at: {cache_dir}")
@@ -39,4 +103,4 @@ def get_model_path(force_download: bool = False) -> str:
         local_dir_use_symlinks=False,
     )
 
-    return downloaded_path
+    return get_precision_model_path(downloaded_path, precision, force=force_download)
@@ -1,9 +1,52 @@
 """ONNX-based selfie segmentation for ARM64 Linux."""
 
+import glob
+import os
+from functools import lru_cache
+
 import cv2
 import numpy as np
 import onnxruntime as ort
 
+# Preferred execution providers, fastest first. XNNPACK and ACL/ArmNN ship
+# NEON kernels for the depthwise convolutions in the MobileNetV3 backbone.
+PREFERRED_PROVIDERS = [
+    "XnnpackExecutionProvider",
+    "ACLExecutionProvider",
+    "ArmNNExecutionProvider",
+    "CPUExecutionProvider",
+]
+
+# Background is blurred at 1/BLUR_SCALE of the frame size
+BLUR_SCALE = 4
+
+# Largest weight of the previous prediction: at 1 the mask would never update
+MAX_SMOOTHING = 0.95
+
+
+def get_providers() -> list[str]:
+    """Get the preferred execution providers available in this build."""
+    available = ort.get_available_providers()
+    providers = [p for p in PREFERRED_PROVIDERS if p in available]
+    return providers or ["CPUExecutionProvider"]
+
+
+def get_inference_threads() -> int:
+    """
+    Get the number of inference threads: the fastest cores on big.LITTLE CPUs
+    (e.g. Apple M-series), every core when they're all alike (Raspberry Pi).
+    """
+    capacities = []
+    for cpu in glob.glob("/sys/devices/system/cpu/cpu[0-9]*/cpu_capacity"):
+        try:
+            with open(cpu) as f:
+                capacities.append(int(f.read()))
+        except (OSError, ValueError):
+            pass
+    if capacities:
+        return capacities.count(max(capacities))
+    return os.cpu_count() or 1
+
 
 class SelfieSegmentation:
     """Selfie segmentation using ONNX Runtime (works on ARM64)."""
@@ -14,10 +57,33 @@ class SelfieSegmentation:
         sess_options = ort.SessionOptions()
         sess_options.log_severity_level = 3
 
+        sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        sess_options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+
+        providers = get_providers()
+        threads = get_inference_threads()
+        if providers[0] == "XnnpackExecutionProvider":
+            # XNNPACK runs its own thread pool; keep ORT's to a single,
+            # non-spinning thread so the two don't compete for cores
+            sess_options.intra_op_num_threads = 1
+            spinning = "0"
+            providers = [
+                ("XnnpackExecutionProvider", {"intra_op_num_threads": threads}),
+                *providers[1:],
+            ]
+        else:
+            sess_options.intra_op_num_threads = threads
+            spinning = "1"
+        sess_options.add_session_config_entry(
+            "session.intra_op.allow_spinning", spinning
+        )
+
         self.session = ort.InferenceSession(
             model_path,
             sess_options,
-            providers=["CPUExecutionProvider"],
+            providers=providers,
         )
 
         # Get model input/output info
@@ -33,25 +99,47 @@ class SelfieSegmentation:
             self.input_shape[3] if isinstance(self.input_shape[3], int) else 256
         )
 
+        # ONNX Runtime reads the input and writes the output in place through
+        # IOBinding instead of copying them on every run
+        self._io = self.session.io_binding()
+
+        # Preallocate the output too when its shape is static (besides batch)
+        output_shape = [1, *self.session.get_outputs()[0].shape[1:]]
+        if all(isinstance(dim, int) for dim in output_shape):
+            self._out = np.empty(output_shape, dtype=np.float32)
+            self._io.bind_output(
+                self.output_name,
+                "cpu",
+                0,
+                np.float32,
+                output_shape,
+                self._out.ctypes.data,
+            )
+        else:
+            self._out = None
+            self._io.bind_output(self.output_name, "cpu")
+
+        # Previous (smoothed) prediction, for temporal smoothing
+        self._prev_mask = None
+
+    def reset(self):
+        """Forget the previous mask, e.g. when the webcam is reopened."""
+        self._prev_mask = None
+
     def preprocess(self, frame: np.ndarray) -> np.ndarray:
         """Preprocess frame for the model."""
-        # Resize to model input size
-        resized = cv2.resize(frame, (self.input_width, self.input_height))
-        # Convert BGR to RGB
-        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-        # Normalize to [0, 1]
-        normalized = rgb.astype(np.float32) / 255.0
-        # Transpose from HWC to CHW format: (H, W, C) -> (C, H, W)
-        transposed = np.transpose(normalized, (2, 0, 1))
-        # Add batch dimension: (1, C, H, W)
-        batched = np.expand_dims(transposed, axis=0)
-        return batched
+        # Resize, BGR to RGB, normalize to [0, 1] and HWC to NCHW in one call
+        size = (self.input_width, self.input_height)
+        return cv2.dnn.blobFromImage(frame, 1.0 / 255.0, size, swapRB=True, crop=False)
 
     def predict(self, frame: np.ndarray) -> np.ndarray:
         """Run inference and return segmentation mask."""
-        input_data = self.preprocess(frame)
-        outputs = self.session.run([self.output_name], {self.input_name: input_data})
-        mask = outputs[0][0]  # Remove batch dimension -> (1, H, W)
+        self._io.bind_cpu_input(self.input_name, self.preprocess(frame))
+        self.session.run_with_iobinding(self._io)
+        output = self._out
+        if output is None:
+            output = self._io.copy_outputs_to_cpu()[0]
+        mask = output[0]  # Remove batch dimension -> (1, H, W)
 
         # Handle NCHW output format: (1, H, W) -> (H, W)
         if len(mask.shape) == 3:
@@ -59,38 +147,144 @@ class SelfieSegmentation:
 
         return mask
 
-    def get_mask(self, frame: np.ndarray, threshold: float = 0.5) -> np.ndarray:
-        """Get binary mask resized to original frame size."""
+    def get_mask(
+        self,
+        frame: np.ndarray,
+        threshold: float = 0.5,
+        smoothing: float = 0.0,
+        size: tuple[int, int] | None = None,
+    ) -> np.ndarray:
+        """
+        Get binary mask resized to original frame size, or to `size` (w, h).
+        `smoothing` is the weight of the previous prediction (0 disables it).
+        """
         mask = self.predict(frame)
 
-        # Resize mask to original frame size
-        h, w = frame.shape[:2]
-        mask_resized = cv2.resize(mask, (w, h))
+        # Blend with the previous prediction before thresholding for more
+        # stable edges between frames
+        if smoothing > 0 and self._prev_mask is not None:
+            cv2.addWeighted(
+                self._prev_mask,
+                smoothing,
+                mask,
+                1.0 - smoothing,
+                0.0,
+                dst=self._prev_mask,
+            )
+        else:
+            self._prev_mask = mask.copy()
+        mask = self._prev_mask
 
-        # Apply threshold for binary mask
-        binary_mask = (mask_resized > threshold).astype(np.float32)
+        # Smooth and threshold at model resolution, where it is much cheaper
+        mask_small = cv2.GaussianBlur(mask, (5, 5), 0)
+        binary_small = (mask_small > threshold).astype(np.float32)
 
-        # Smooth the mask edges
-        binary_mask = cv2.GaussianBlur(binary_mask, (7, 7), 0)
+        # Resize mask to original frame size (bilinear softens the edges)
+        if size is None:
+            h, w = frame.shape[:2]
+            size = (w, h)
+        return cv2.resize(binary_small, size, interpolation=cv2.INTER_LINEAR)
 
-        return binary_mask
 
+def blur_sigma(blur_strength: int) -> float:
+    """Sigma OpenCV derives for GaussianBlur with this kernel size (and sigma=0)."""
+    return 0.3 * ((blur_strength - 1) * 0.5 - 1) + 0.8
 
-def apply_background_blur(
-    frame: np.ndarray, mask: np.ndarray, blur_strength: int = 21
-) -> np.ndarray:
-    """Apply blur to background while keeping foreground sharp."""
+
+@lru_cache(maxsize=4)
+def _blur_plan(
+    blur_strength: int, width: int, height: int
+) -> tuple[tuple[int, int], float]:
+    """
+    Get the downscaled size and blur sigma for a blur strength and frame size.
+    These only change with the config, so they're computed once per setting.
+    """
     # Ensure blur_strength is odd
     if blur_strength % 2 == 0:
         blur_strength += 1
 
-    # Create blurred version of the frame
-    blurred = cv2.GaussianBlur(frame, (blur_strength, blur_strength), 0)
+    small_size = (max(1, width // BLUR_SCALE), max(1, height // BLUR_SCALE))
+    # Same blur as a full-size GaussianBlur, in downscaled pixels
+    return small_size, blur_sigma(blur_strength) / BLUR_SCALE
+
+
+@lru_cache(maxsize=1)
+def _use_opencl() -> bool:
+    """
+    Check whether to blur through OpenCL: only on a GPU, since CPU
+    implementations (e.g. PoCL) just add copies and kernel compiles.
+    """
+    if not cv2.ocl.useOpenCL():
+        return False
+    return bool(cv2.ocl.Device.getDefault().type() & cv2.ocl.Device_TYPE_GPU)
 
-    # Expand mask to 3 channels
-    mask_3ch = np.stack([mask] * 3, axis=-1)
 
-    # Blend: foreground (mask=1) stays sharp, background (mask=0) gets blurred
-    result = (frame * mask_3ch + blurred * (1 - mask_3ch)).astype(np.uint8)
+def _blur_background(frame: np.ndarray, blur_strength: int) -> np.ndarray:
+    """Blur a whole frame (any channel count) for the background."""
+    # Blur is band-limiting, so blur a quarter-size copy with a
+    # proportionally smaller sigma and upscale it. The kernel at that size
+    # is small enough that a Gaussian costs about as much as a box blur.
+    # With an OpenCL GPU (e.g. Mesa on Asahi, V3D on Raspberry Pi 5),
+    # OpenCV runs the downscale and blur there when given a UMat, leaving
+    # the CPU for ONNX.
+    h, w = frame.shape[:2]
+    small_size, sigma = _blur_plan(blur_strength, w, h)
+    src = cv2.UMat(frame) if _use_opencl() else frame
+    small = cv2.resize(src, small_size, interpolation=cv2.INTER_AREA)
+    small_blurred = cv2.GaussianBlur(small, (0, 0), sigma)
+    if isinstance(small_blurred, cv2.UMat):
+        # Only download the small image; upscale on the CPU, where the blend runs
+        small_blurred = small_blurred.get()
+    return cv2.resize(small_blurred, (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+def apply_background_blur(
+    frame: np.ndarray,
+    mask: np.ndarray,
+    blur_strength: int = 21,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Apply blur to background while keeping foreground sharp.
+    If `out` is given (same shape as frame), the result is written into it.
+    """
+    blurred = _blur_background(frame, blur_strength)
+
+    # Blend: foreground (mask=1) stays sharp, background (mask=0) gets blurred.
+    # blendLinear does this in one pass over uint8, using the single-channel
+    # mask as the weight for every channel.
+    result = cv2.blendLinear(frame, blurred, mask, 1.0 - mask, dst=out)
 
     return result
+
+
+def yuyv_thumbnail(frame: np.ndarray) -> np.ndarray:
+    """Get a half-size BGR image from a (H, W, 2) YUYV frame, for the model."""
+    h, w = frame.shape[:2]
+    # Keep every other row and every other Y-U-Y-V macropixel, so the
+    # conversion only touches a quarter of the pixels
+    macropixels = frame.reshape(h, w // 2, 4)[::2, ::2]
+    half = np.ascontiguousarray(macropixels).reshape(macropixels.shape[0], -1, 2)
+    return cv2.cvtColor(half, cv2.COLOR_YUV2BGR_YUYV)
+
+
+def apply_background_blur_yuyv(
+    frame: np.ndarray,
+    mask: np.ndarray,
+    blur_strength: int = 21,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Like apply_background_blur, for (H, W, 2) YUYV frames. Only the luma is
+    blurred: blur in chroma is barely visible, and this touches a third of
+    the data of a BGR frame.
+    """
+    if out is None:
+        out = np.empty_like(frame)
+
+    luma = cv2.extractChannel(frame, 0)
+    blurred = _blur_background(luma, blur_strength)
+    out[:, :, 0] = cv2.blendLinear(luma, blurred, mask, 1.0 - mask)
+    out[:, :, 1] = frame[:, :, 1]  # Chroma as captured
+
+    return out
@@ -6,204 +6,305 @@ Detects your Linux distribution and provides appropriate installation commands.
 """
 
 import os
-import shutil
-import subprocess
 import sys
+from functools import lru_cache
 from pathlib import Path
 
-
-def run_cmd(cmd: list[str], check: bool = False) -> subprocess.CompletedProcess:
-    """Run a command and return the result."""
-    return subprocess.run(cmd, capture_output=True, text=True, check=check)
+# (family, package manager) by os-release ID
+_DISTRO_MAP = {
+    "fedora": ("fedora", "dnf"),
+    "rhel": ("fedora", "dnf"),
+    "centos": ("fedora", "dnf"),
+    "rocky": ("fedora", "dnf"),
+    "alma": ("fedora", "dnf"),
+    "debian": ("debian", "apt"),
+    "ubuntu": ("debian", "apt"),
+    "linuxmint": ("debian", "apt"),
+    "pop": ("debian", "apt"),
+    "raspbian": ("debian", "apt"),
+    "arch": ("arch", "pacman"),
+    "manjaro": ("arch", "pacman"),
+    "endeavouros": ("arch", "pacman"),
+}
+
+# Fallback for other IDs: (ID_LIKE substring, (family, package manager)), in order
+_FAMILY_LIKE = (
+    ("fedora", ("fedora", "dnf")),
+    ("debian", ("debian", "apt")),
+    ("ubuntu", ("debian", "apt")),
+    ("arch", ("arch", "pacman")),
+)
+
+# Installation instructions by (family, is_asahi)
+_INSTALL_INSTRUCTIONS = {
+    ("fedora", True): "\n".join([
+        "# Asahi Linux (Fedora-based)",
+        "sudo dnf install akmod-v4l2loopback",
+        "sudo dnf install kernel-16k-devel  # For Asahi kernel",
+        "sudo akmods --force",
+    ]),
+    ("fedora", False): "\n".join([
+        "# Fedora",
+        "sudo dnf install akmod-v4l2loopback",
+    ]),
+    ("debian", False): "\n".join([
+        "# Debian/Ubuntu/Raspberry Pi OS",
+        "sudo apt update",
+        "sudo apt install v4l2loopback-dkms v4l2loopback-utils",
+    ]),
+    ("arch", False): "\n".join([
+        "# Arch Linux / Manjaro",
+        "sudo pacman -S v4l2loopback-dkms",
+    ]),
+}
+_DEFAULT_INSTALL_INSTRUCTIONS = "\n".join([
+    "# Unknown distribution - try one of:",
+    "# Fedora: sudo dnf install akmod-v4l2loopback",
+    "# Debian: sudo apt install v4l2loopback-dkms",
+    "# Arch: sudo pacman -S v4l2loopback-dkms",
+])
+
+_DEFAULT_MODPROBE = 'sudo modprobe v4l2loopback devices=1 video_nr=10 card_label="BlurCam" exclusive_caps=1'
+
+
+def _read_small(path, n: int = 4096) -> bytes:
+    """
+    Read a small file (sysfs, procfs, /etc) unbuffered.
+    Keeps reading until EOF, since procfs hands out large files in pieces.
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        chunks = []
+        while chunk := os.read(fd, n):
+            chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+# os-release keys used by detect_distro()
+_OS_RELEASE_KEYS = frozenset({"ID", "NAME", "ID_LIKE"})
+
+
+@lru_cache(maxsize=1)
+def _load_os_release() -> dict:
+    """Parse the os-release keys we need into a dict (read once per process)."""
+    env = {}
+    for path in (Path("/etc/os-release"), Path("/usr/lib/os-release")):
+        if path.is_file():
+            for line in _read_small(path).decode(errors="replace").splitlines():
+                key, _, value = line.partition("=")
+                if key in _OS_RELEASE_KEYS:
+                    env[key] = value.strip().strip('"').strip("'")
+                    if len(env) == len(_OS_RELEASE_KEYS):
+                        break
+            break
+    return env
 
 
 def detect_distro() -> dict:
     """Detect the Linux distribution."""
     distro = {"id": "unknown", "name": "Unknown", "family": "unknown"}
 
-    # Try os-release first
-    os_release = Path("/etc/os-release")
-    if os_release.exists():
-        content = os_release.read_text()
-        for line in content.splitlines():
-            if line.startswith("ID="):
-                distro["id"] = line.split("=")[1].strip().strip('"').lower()
-            elif line.startswith("NAME="):
-                distro["name"] = line.split("=", 1)[1].strip().strip('"')
-            elif line.startswith("ID_LIKE="):
-                distro["family"] = line.split("=")[1].strip().strip('"').lower()
-
-    # Determine package manager family
-    if distro["id"] in ("fedora", "rhel", "centos", "rocky", "alma"):
-        distro["family"] = "fedora"
-        distro["pkg_manager"] = "dnf"
-    elif distro["id"] in ("debian", "ubuntu", "linuxmint", "pop", "raspbian"):
-        distro["family"] = "debian"
-        distro["pkg_manager"] = "apt"
-    elif distro["id"] in ("arch", "manjaro", "endeavouros"):
-        distro["family"] = "arch"
-        distro["pkg_manager"] = "pacman"
-    elif "fedora" in distro.get("family", ""):
-        distro["family"] = "fedora"
-        distro["pkg_manager"] = "dnf"
-    elif "debian" in distro.get("family", "") or "ubuntu" in distro.get("family", ""):
-        distro["family"] = "debian"
-        distro["pkg_manager"] = "apt"
-    elif "arch" in distro.get("family", ""):
-        distro["family"] = "arch"
-        distro["pkg_manager"] = "pacman"
-
-    # Check for Asahi Linux
-    uname = run_cmd(["uname", "-r"])
-    if "asahi" in uname.stdout.lower():
-        distro["is_asahi"] = True
-    else:
-        distro["is_asahi"] = False
+    env = _load_os_release()
+    if "ID" in env:
+        distro["id"] = env["ID"].lower()
+    if "NAME" in env:
+        distro["name"] = env["NAME"]
+    if "ID_LIKE" in env:
+        distro["family"] = env["ID_LIKE"].lower()
+
+    # Determine package manager family, by ID first, then by ID_LIKE
+    family = _DISTRO_MAP.get(distro["id"])
+    if family is None:
+        like = distro.get("family", "")
+        family = next((fam for needle, fam in _FAMILY_LIKE if needle in like), None)
+    if family is not None:
+        distro["family"], distro["pkg_manager"] = family
+
+    # Check for Asahi Linux (kernel release, e.g. 6.8.9-400.asahi.fc40)
+    distro["is_asahi"] = "asahi" in os.uname().release.lower()
 
     return distro
 
 
+@lru_cache(maxsize=1)
+def _probe_installed() -> bool:
+    """Check if the module is available for the running kernel."""
+    modules_dir = Path("/lib/modules") / os.uname().release
+    modules_dep = modules_dir / "modules.dep"
+    if modules_dep.exists():
+        return "/v4l2loopback.ko" in modules_dep.read_text()
+    return any(modules_dir.rglob("v4l2loopback.ko*"))
+
+
+@lru_cache(maxsize=1)
+def _probe_loaded() -> bool:
+    """Check if the module is loaded (lsmod just formats /proc/modules)."""
+    try:
+        data = _read_small("/proc/modules")
+    except OSError:
+        return False
+    # One substring scan over the buffer instead of splitting it into lines
+    return data.startswith(b"v4l2loopback ") or b"\nv4l2loopback " in data
+
+
+@lru_cache(maxsize=1)
+def _probe_device() -> tuple[str, str] | None:
+    """Find the virtual camera device, as (path, name)."""
+    # Every V4L2 device is linked here
+    try:
+        with os.scandir("/sys/class/video4linux") as it:
+            # Lowest device number first, like the old /dev/videoN probe
+            for entry in sorted(it, key=lambda e: (len(e.name), e.name)):
+                try:
+                    name = _read_small(os.path.join(entry.path, "name")).strip()
+                except OSError:
+                    continue  # Device went away
+                # Match on bytes, only decode the one we report
+                lowered = name.lower()
+                if b"loopback" in lowered or b"virtual" in lowered:
+                    return f"/dev/{entry.name}", name.decode(errors="replace")
+    except FileNotFoundError:
+        pass
+    return None
+
+
 def check_v4l2loopback() -> dict:
-    """Check v4l2loopback module status."""
-    result = {"installed": False, "loaded": False, "device": None}
-
-    # Check if module is available
-    modinfo = run_cmd(["modinfo", "v4l2loopback"])
-    result["installed"] = modinfo.returncode == 0
-
-    # Check if module is loaded
-    lsmod = run_cmd(["lsmod"])
-    result["loaded"] = "v4l2loopback" in lsmod.stdout
-
-    # Find virtual camera device
-    for i in range(20):
-        dev = f"/dev/video{i}"
-        if os.path.exists(dev):
-            # Check if it's a v4l2loopback device
-            try:
-                name_path = f"/sys/devices/virtual/video4linux/video{i}/name"
-                if os.path.exists(name_path):
-                    with open(name_path) as f:
-                        name = f.read().strip()
-                        if "loopback" in name.lower() or "virtual" in name.lower():
-                            result["device"] = dev
-                            result["device_name"] = name
-                            break
-            except:
-                pass
+    """
+    Check v4l2loopback module status.
+    Probes are cached per process; call check_v4l2loopback.cache_clear()
+    to check again (e.g. after loading the module).
+    """
+    result = {
+        "installed": _probe_installed(),
+        "loaded": _probe_loaded(),
+        "device": None,
+    }
+
+    device = _probe_device()
+    if device is not None:
+        result["device"], result["device_name"] = device
 
     return result
 
 
-def get_install_instructions(distro: dict) -> str:
-    """Get installation instructions for the detected distro."""
-    instructions = []
-
-    if distro["family"] == "fedora":
-        if distro["is_asahi"]:
-            instructions.append("# Asahi Linux (Fedora-based)")
-            instructions.append("sudo dnf install akmod-v4l2loopback")
-            instructions.append("sudo dnf install kernel-16k-devel  # For Asahi kernel")
-            instructions.append("sudo akmods --force")
-        else:
-            instructions.append("# Fedora")
-            instructions.append("sudo dnf install akmod-v4l2loopback")
-
-    elif distro["family"] == "debian":
-        instructions.append("# Debian/Ubuntu/Raspberry Pi OS")
-        instructions.append("sudo apt update")
-        instructions.append("sudo apt install v4l2loopback-dkms v4l2loopback-utils")
-
-    elif distro["family"] == "arch":
-        instructions.append("# Arch Linux / Manjaro")
-        instructions.append("sudo pacman -S v4l2loopback-dkms")
+def _clear_v4l2loopback_cache():
+    """Forget the cached v4l2loopback probes."""
+    _probe_installed.cache_clear()
+    _probe_loaded.cache_clear()
+    _probe_device.cache_clear()
 
-    else:
-        instructions.append("# Unknown distribution - try one of:")
-        instructions.append("# Fedora: sudo dnf install akmod-v4l2loopback")
-        instructions.append("# Debian: sudo apt install v4l2loopback-dkms")
-        instructions.append("# Arch: sudo pacman -S v4l2loopback-dkms")
 
-    return "\n".join(instructions)
+check_v4l2loopback.cache_clear = _clear_v4l2loopback_cache
+
+
+def get_install_instructions(distro: dict) -> str:
+    """Get installation instructions for the detected distro."""
+    family = distro["family"]
+    return _INSTALL_INSTRUCTIONS.get(
+        (family, distro.get("is_asahi", False)),
+        _INSTALL_INSTRUCTIONS.get((family, False), _DEFAULT_INSTALL_INSTRUCTIONS),
+    )
 
 
 def get_modprobe_command(device_nr: int = 10) -> str:
     """Get the modprobe command to load v4l2loopback."""
+    if device_nr == 10:
+        return _DEFAULT_MODPROBE
     return f'sudo modprobe v4l2loopback devices=1 video_nr={device_nr} card_label="BlurCam" exclusive_caps=1'
 
 
+_OK = "\033[92m\u2713\033[0m"
+_FAIL = "\033[91m\u2717\033[0m"
+
+
+def format_status(label: str, ok: bool, detail: str = "") -> str:
+    """Format a status line."""
+    glyph = _OK if ok else _FAIL
+    suffix = f" ({detail})" if detail else ""
+    return f"  {glyph} {label}{suffix}"
+
+
 def print_status(label: str, ok: bool, detail: str = ""):
     """Print a status line."""
-    status = "\033[92m✓\033[0m" if ok else "\033[91m✗\033[0m"
-    print(f"  {status} {label}", end="")
-    if detail:
-        print(f" ({detail})", end="")
-    print()
+    sys.stdout.write(format_status(label, ok, detail) + "\n")
 
 
 def main():
-    print()
-    print("=" * 60)
-    print("  blurcam System Setup Check")
-    print("=" * 60)
-    print()
+    # Collect the report and write it at once
+    out = [
+        "",
+        "=" * 60,
+        "  blurcam System Setup Check",
+        "=" * 60,
+        "",
+    ]
 
     # Detect distribution
     distro = detect_distro()
-    print(f"Distribution: {distro['name']}")
+    out.append(f"Distribution: {distro['name']}")
     if distro["is_asahi"]:
-        print("             (Asahi Linux detected)")
-    print()
+        out.append("             (Asahi Linux detected)")
+    out.append("")
 
     # Check v4l2loopback
-    print("Checking v4l2loopback:")
+    out.append("Checking v4l2loopback:")
     v4l2 = check_v4l2loopback()
 
-    print_status("Module installed", v4l2["installed"])
-    print_status("Module loaded", v4l2["loaded"])
-    print_status(
+    out.append(format_status("Module installed", v4l2["installed"]))
+    out.append(format_status("Module loaded", v4l2["loaded"]))
+    out.append(format_status(
         "Virtual camera device",
         v4l2["device"] is not None,
         v4l2.get("device", "not found"),
-    )
-    print()
+    ))
+    out.append("")
 
     # Provide instructions if needed
     if not v4l2["installed"]:
-        print("v4l2loopback is not installed. Install it with:")
-        print()
-        print(get_install_instructions(distro))
-        print()
+        out += [
+            "v4l2loopback is not installed. Install it with:",
+            "",
+            get_install_instructions(distro),
+            "",
+        ]
 
     elif not v4l2["loaded"]:
-        print("v4l2loopback is installed but not loaded. Load it with:")
-        print()
-        print(get_modprobe_command())
-        print()
-        print("To load automatically at boot, create /etc/modules-load.d/v4l2loopback.conf:")
-        print()
-        print('  echo "v4l2loopback" | sudo tee /etc/modules-load.d/v4l2loopback.conf')
-        print()
-        print("And configure options in /etc/modprobe.d/v4l2loopback.conf:")
-        print()
-        print(
-            '  echo \'options v4l2loopback video_nr=10 card_label="BlurCam" exclusive_caps=1\' | sudo tee /etc/modprobe.d/v4l2loopback.conf'
-        )
-        print()
+        out += [
+            "v4l2loopback is installed but not loaded. Load it with:",
+            "",
+            get_modprobe_command(),
+            "",
+            "To load automatically at boot, create /etc/modules-load.d/v4l2loopback.conf:",
+            "",
+            '  echo "v4l2loopback" | sudo tee /etc/modules-load.d/v4l2loopback.conf',
+            "",
+            "And configure options in /etc/modprobe.d/v4l2loopback.conf:",
+            "",
+            '  echo \'options v4l2loopback video_nr=10 card_label="BlurCam" exclusive_caps=1\' | sudo tee /etc/modprobe.d/v4l2loopback.conf',
+            "",
+        ]
 
     elif v4l2["device"] is None:
-        print("Module is loaded but no virtual camera device found.")
-        print("Try reloading with correct options:")
-        print()
-        print("  sudo modprobe -r v4l2loopback")
-        print(get_modprobe_command())
-        print()
+        out += [
+            "Module is loaded but no virtual camera device found.",
+            "Try reloading with correct options:",
+            "",
+            "  sudo modprobe -r v4l2loopback",
+            get_modprobe_command(),
+            "",
+        ]
 
     else:
-        print("\033[92mAll good! You can now run:\033[0m")
-        print()
-        print(f"  blurcam")
-        print()
+        out += [
+            "\033[92mAll good! You can now run:\033[0m",
+            "",
+            "  blurcam",
+            "",
+        ]
+
+    sys.stdout.write("\n".join(out) + "\n")
 
     return 0 if (v4l2["installed"] and v4l2["loaded"] and v4l2["device"]) else 1
 